@@ -1,8 +1,22 @@
+import math
+from types import SimpleNamespace
+from typing import List, NamedTuple
+
 import streamlit as st
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
 
+from kernel_version import KERNEL_VERSION
+
+try:
+    # Ahead-of-time build produced by build_kernels.py; builds from an older
+    # kernels.py lack kernel_version or report a different one
+    from risk_kernels import core_calc as _core_calc, kernel_version as _built_kernel_version
+    if _built_kernel_version() != KERNEL_VERSION:
+        raise ImportError("risk_kernels is stale; rerun build_kernels.py")
+except ImportError:
+    from kernels import core_calc as _core_calc
+
 # Currency configuration
 CURRENCIES = {
     'USD': {'symbol': '$', 'name': 'US Dollar', 'icon': '💵'},
@@ -11,6 +25,20 @@ CURRENCIES = {
     'INR': {'symbol': '₹', 'name': 'Indian Rupee', 'icon': '🇮🇳'}
 }
 
+# Display suffix per currency, e.g. " (USD)"
+_SUFFIX = {code: f" ({code})" for code in CURRENCIES}
+
+# Input labels per currency, built once instead of on every rerun
+LABELS = {
+    code: SimpleNamespace(
+        account=f"Account Size ({info['symbol']})",
+        entry=f"Entry Price per Share ({info['symbol']})",
+        target=f"Target Price per Share ({info['symbol']})",
+        stop=f"Technical Stop Loss Price ({info['symbol']})"
+    )
+    for code, info in CURRENCIES.items()
+}
+
 # Set page config
 st.set_page_config(
     page_title="Trade Risk Calculator",
@@ -19,7 +47,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+CSS = """
 <style>
     .stApp {
         background-color: #1E1E1E;
@@ -54,53 +82,88 @@ st.markdown("""
         margin: 1rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(CSS, unsafe_allow_html=True)
+
+# Target multipliers for the default 5-step table, built once at import
+_DEFAULT_MULTIPLIERS = np.linspace(0.8, 1.2, 5)
+_DEFAULT_MULTIPLIERS.flags.writeable = False
+
+RISK_REWARD_COLUMNS = ['Target Price', 'Reward per Share', 'Risk-to-Reward Ratio', 'Reward-to-Risk Ratio']
+
+# Shared result for targets at or below entry
+_EMPTY_TABLE = np.empty((0, len(RISK_REWARD_COLUMNS)))
+_EMPTY_TABLE.flags.writeable = False
 
 def generate_risk_reward_table(entry_price, base_target, risk_per_share, n_steps=5):
-    """Generate a table showing risk-to-reward ratios for different target prices."""
+    """Generate a table showing risk-to-reward ratios for different target prices.
+    
+    Returns an (n_steps, len(RISK_REWARD_COLUMNS)) float array in that column order.
+    """
     base_reward = base_target - entry_price
     if base_reward <= 0:
-        return pd.DataFrame()
+        return _EMPTY_TABLE
     
-    multipliers = np.linspace(0.8, 1.2, n_steps)
-    target_prices = entry_price + base_reward * multipliers
+    if n_steps == len(_DEFAULT_MULTIPLIERS):
+        multipliers = _DEFAULT_MULTIPLIERS
+    else:
+        multipliers = np.linspace(0.8, 1.2, n_steps)
+    rewards = base_reward * multipliers
     
-    data = {
-        'Target Price': target_prices,
-        'Reward per Share': target_prices - entry_price,
-        'Risk-to-Reward Ratio': risk_per_share / (target_prices - entry_price),
-        'Reward-to-Risk Ratio': (target_prices - entry_price) / risk_per_share
-    }
+    buf = np.empty((n_steps, len(RISK_REWARD_COLUMNS)), dtype=np.float64)
+    buf[:, 0] = entry_price + rewards
+    buf[:, 1] = rewards
+    buf[:, 2] = risk_per_share / rewards
+    buf[:, 3] = rewards / risk_per_share
     
-    return pd.DataFrame(data)
+    return buf
+
+def format_risk_reward_table(matrix, currency='USD'):
+    """Format the risk-reward table as a list of row dicts of display strings."""
+    suffix = _SUFFIX[currency]
+    return [
+        dict(zip(RISK_REWARD_COLUMNS, (
+            f"{target:,.2f}{suffix}",
+            f"{reward:,.2f}{suffix}",
+            f"{risk_reward:.2f}",
+            f"{reward_risk:.2f}:1"
+        )))
+        for target, reward, risk_reward, reward_risk in matrix.tolist()
+    ]
+
+# Target multiples of the base reward for the 3-part exit
+_EXIT_MULTS = np.array([1.0, 2.0, 3.0])
+_EXIT_MULTS.flags.writeable = False
 
+class ExitStrategy(NamedTuple):
+    """Immutable result of the 3-part exit strategy calculation."""
+    targets: List[float]
+    profits: List[float]
+    total_profit: float
+    shares_per_target: float
+
+@st.cache_data(show_spinner=False)
 def calculate_exit_strategy(entry_price, target_price, number_of_shares):
     """Calculate the 3-part exit strategy."""
-    target1 = target_price
-    target2 = entry_price + 2 * (target_price - entry_price)
-    target3 = entry_price + 3 * (target_price - entry_price)
-    
+    diffs = (target_price - entry_price) * _EXIT_MULTS
+    targets = entry_price + diffs
     shares_per_target = number_of_shares / 3
-    profit1 = shares_per_target * (target1 - entry_price)
-    profit2 = shares_per_target * (target2 - entry_price)
-    profit3 = shares_per_target * (target3 - entry_price)
-    total_profit = profit1 + profit2 + profit3
+    profits = shares_per_target * diffs
     
-    return {
-        'targets': [target1, target2, target3],
-        'profits': [profit1, profit2, profit3],
-        'total_profit': total_profit,
-        'shares_per_target': shares_per_target
-    }
+    return ExitStrategy(
+        targets=targets.tolist(),
+        profits=profits.tolist(),
+        total_profit=float(profits.sum()),
+        shares_per_target=shares_per_target
+    )
 
+@st.cache_data(show_spinner=False)
 def calculate_standard_risk(account_size, risk_percentage, number_of_shares, entry_price, target_price):
     """Calculate standard risk metrics."""
-    risk_fraction = risk_percentage / 100.0
-    total_risk = account_size * risk_fraction
-    risk_per_share = total_risk / number_of_shares
-    recommended_stop_loss = entry_price - risk_per_share
-    capital_required = number_of_shares * entry_price
-    reward_per_share = target_price - entry_price
+    (total_risk, risk_per_share, recommended_stop_loss, capital_required,
+     reward_per_share) = _core_calc(
+        account_size, risk_percentage, number_of_shares, entry_price, target_price
+    )
     
     exit_strategy = calculate_exit_strategy(entry_price, target_price, number_of_shares)
     
@@ -113,13 +176,15 @@ def calculate_standard_risk(account_size, risk_percentage, number_of_shares, ent
         'exit_strategy': exit_strategy
     }
 
+@st.cache_data(show_spinner=False)
 def calculate_position_size(account_size, risk_percentage, entry_price, technical_stoploss, target_price):
     """Calculate position size based on technical analysis."""
     risk_fraction = risk_percentage / 100.0
     total_risk = account_size * risk_fraction
     risk_per_share_tech = entry_price - technical_stoploss
     adjusted_shares = total_risk / risk_per_share_tech
-    adjusted_shares_div3 = round(adjusted_shares / 3) * 3
+    # Nearest multiple of 3, rounding halves up
+    adjusted_shares_div3 = math.floor((adjusted_shares + 1.5) / 3.0) * 3
     capital_required = adjusted_shares_div3 * entry_price
     
     exit_strategy = calculate_exit_strategy(entry_price, target_price, adjusted_shares_div3)
@@ -133,72 +198,48 @@ def calculate_position_size(account_size, risk_percentage, entry_price, technica
     }
 
 def format_currency(value, currency='USD'):
-    """Format a number as currency with the appropriate symbol."""
-    symbol = CURRENCIES[currency]['symbol']
-    return f"{value:,.2f} ({currency})"
+    """Format a number with its currency code suffix."""
+    return f"{value:,.2f}{_SUFFIX[currency]}"
+
+_EXIT_ACTIONS = (
+    'Sell 1/3 position, move stop to entry',
+    'Sell 1/3 position, move stop to Target 1',
+    'Sell remaining position'
+)
 
 def display_exit_strategy(exit_strategy, currency='USD'):
     """Display the exit strategy in a formatted way."""
     st.markdown("#### Exit Strategy")
-    st.markdown('<div class="exit-strategy">', unsafe_allow_html=True)
     
-    for i, (target, profit) in enumerate(zip(exit_strategy['targets'], exit_strategy['profits']), 1):
-        st.markdown(f"""
-        **Target {i}**
-        - Price: {format_currency(target, currency)}
-        - Shares: {exit_strategy['shares_per_target']:.0f}
-        - Profit: {format_currency(profit, currency)}
-        - Action: {'Sell 1/3 position, move stop to entry' if i == 1 else 
-                  'Sell 1/3 position, move stop to Target 1' if i == 2 else 
-                  'Sell remaining position'}
-        """)
+    shares = exit_strategy.shares_per_target
+    blocks = [
+        f"**Target {i + 1}**\n"
+        f"- Price: {format_currency(target, currency)}\n"
+        f"- Shares: {shares:.0f}\n"
+        f"- Profit: {format_currency(profit, currency)}\n"
+        f"- Action: {_EXIT_ACTIONS[i]}"
+        for i, (target, profit) in enumerate(zip(exit_strategy.targets, exit_strategy.profits))
+    ]
+    blocks.append(f"**Total Potential Profit**: {format_currency(exit_strategy.total_profit, currency)}")
     
-    st.markdown(f"""
-    **Total Potential Profit**: {format_currency(exit_strategy['total_profit'], currency)}
-    """)
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# Main app
-st.title("Trade Risk Calculator")
-st.markdown("Calculate optimal position sizes and manage risk effectively")
-
-# Initialize session state for currency if not exists
-if 'selected_currency' not in st.session_state:
-    st.session_state.selected_currency = 'USD'
-
-# Currency selector with icons
-st.markdown("### Select Currency")
-currency_cols = st.columns(len(CURRENCIES))
-for i, (currency_code, currency_info) in enumerate(CURRENCIES.items()):
-    with currency_cols[i]:
-        if st.button(
-            f"{currency_info['icon']} {currency_code}",
-            key=f"currency_{currency_code}",
-            use_container_width=True,
-            type="primary" if st.session_state.selected_currency == currency_code else "secondary"
-        ):
-            st.session_state.selected_currency = currency_code
-
-# Info box
-with st.expander("ℹ️ Important Information", expanded=True):
-    st.info("""
-    - Use the Standard Calculator for basic risk assessment
-    - Fine-tune with the Position Size Calculator
-    - All calculations assume a 3-part exit strategy for optimal risk management
-    """)
+    # Blank lines around the blocks let markdown render inside the div
+    st.markdown(
+        '<div class="exit-strategy">\n\n' + "\n\n".join(blocks) + '\n\n</div>',
+        unsafe_allow_html=True
+    )
 
-# Create two columns for the calculators
-col1, col2 = st.columns(2)
-
-# Standard Risk Calculator
-with col1:
+@st.fragment
+def _standard_calc_fragment():
+    """Render the Standard Risk Calculator; submitting it reruns only this fragment."""
+    currency = st.session_state.selected_currency
+    labels = LABELS[currency]
     st.subheader("Standard Risk Calculator")
     with st.form("standard_calculator"):
-        account_size_1 = st.number_input(f"Account Size ({CURRENCIES[st.session_state.selected_currency]['symbol']})", value=5000.0, min_value=1.0, step=100.0)
+        account_size_1 = st.number_input(labels.account, value=5000.0, min_value=1.0, step=100.0)
         risk_percentage_1 = st.number_input("Risk Percentage", value=1.0, min_value=0.1, max_value=5.0, step=0.1)
         number_of_shares_1 = st.number_input("Number of Shares", value=45.0, min_value=1.0, step=1.0)
-        entry_price_1 = st.number_input(f"Entry Price per Share ({CURRENCIES[st.session_state.selected_currency]['symbol']})", value=10.0, min_value=0.01, step=0.01)
-        target_price_1 = st.number_input(f"Target Price per Share ({CURRENCIES[st.session_state.selected_currency]['symbol']})", value=12.50, min_value=0.01, step=0.01)
+        entry_price_1 = st.number_input(labels.entry, value=10.0, min_value=0.01, step=0.01)
+        target_price_1 = st.number_input(labels.target, value=12.50, min_value=0.01, step=0.01)
         
         if st.form_submit_button("Calculate Risk"):
             results = calculate_standard_risk(
@@ -206,40 +247,42 @@ with col1:
                 entry_price_1, target_price_1
             )
             
-            st.markdown("### Trade Analysis")
-            st.markdown("#### Capital Requirements")
-            st.write(f"Total Capital: {format_currency(results['capital_required'], st.session_state.selected_currency)}")
-            st.write(f"Risk per Trade: {format_currency(results['total_risk'], st.session_state.selected_currency)}")
-            st.write(f"Risk per Share: {format_currency(results['risk_per_share'], st.session_state.selected_currency)}")
-            
-            st.markdown("#### Risk Metrics")
-            st.write(f"Stop Loss: {format_currency(results['recommended_stop_loss'], st.session_state.selected_currency)}")
-            st.write(f"Reward per Share: {format_currency(results['reward_per_share'], st.session_state.selected_currency)}")
+            st.markdown(
+                "### Trade Analysis\n\n"
+                "#### Capital Requirements\n\n"
+                f"Total Capital: {format_currency(results['capital_required'], currency)}\n\n"
+                f"Risk per Trade: {format_currency(results['total_risk'], currency)}\n\n"
+                f"Risk per Share: {format_currency(results['risk_per_share'], currency)}\n\n"
+                "#### Risk Metrics\n\n"
+                f"Stop Loss: {format_currency(results['recommended_stop_loss'], currency)}\n\n"
+                f"Reward per Share: {format_currency(results['reward_per_share'], currency)}"
+            )
             
             # Risk-to-Reward Matrix
             st.markdown("#### Risk-to-Reward Matrix")
             matrix = generate_risk_reward_table(
                 entry_price_1, target_price_1, results['risk_per_share']
             )
-            st.dataframe(matrix.style.format({
-                'Target Price': lambda x: format_currency(x, st.session_state.selected_currency),
-                'Reward per Share': lambda x: format_currency(x, st.session_state.selected_currency),
-                'Risk-to-Reward Ratio': '{:.2f}',
-                'Reward-to-Risk Ratio': '{:.2f}:1'
-            }))
+            if len(matrix):
+                st.table(format_risk_reward_table(matrix, currency))
+            else:
+                st.info("Target price must exceed entry price.")
             
             # Display Exit Strategy
-            display_exit_strategy(results['exit_strategy'], st.session_state.selected_currency)
+            display_exit_strategy(results['exit_strategy'], currency)
 
-# Position Size Calculator
-with col2:
+@st.fragment
+def _position_calc_fragment():
+    """Render the Position Size Calculator; submitting it reruns only this fragment."""
+    currency = st.session_state.selected_currency
+    labels = LABELS[currency]
     st.subheader("Position Size Calculator")
     with st.form("position_calculator"):
-        account_size_2 = st.number_input(f"Account Size ({CURRENCIES[st.session_state.selected_currency]['symbol']})", value=5000.0, min_value=1.0, step=100.0, key="account_size_2")
+        account_size_2 = st.number_input(labels.account, value=5000.0, min_value=1.0, step=100.0, key="account_size_2")
         risk_percentage_2 = st.number_input("Risk Percentage", value=1.0, min_value=0.1, max_value=5.0, step=0.1, key="risk_percentage_2")
-        entry_price_2 = st.number_input(f"Entry Price per Share ({CURRENCIES[st.session_state.selected_currency]['symbol']})", value=10.0, min_value=0.01, step=0.01, key="entry_price_2")
-        technical_stoploss = st.number_input(f"Technical Stop Loss Price ({CURRENCIES[st.session_state.selected_currency]['symbol']})", value=8.89, min_value=0.01, step=0.01)
-        target_price_2 = st.number_input(f"Target Price per Share ({CURRENCIES[st.session_state.selected_currency]['symbol']})", value=12.50, min_value=0.01, step=0.01, key="target_price_2")
+        entry_price_2 = st.number_input(labels.entry, value=10.0, min_value=0.01, step=0.01, key="entry_price_2")
+        technical_stoploss = st.number_input(labels.stop, value=8.89, min_value=0.01, step=0.01)
+        target_price_2 = st.number_input(labels.target, value=12.50, min_value=0.01, step=0.01, key="target_price_2")
         
         if st.form_submit_button("Calculate Position Size"):
             results = calculate_position_size(
@@ -247,27 +290,66 @@ with col2:
                 technical_stoploss, target_price_2
             )
             
-            st.markdown("### Trade Analysis")
-            st.markdown("#### Position Details")
-            st.write(f"Adjusted Position Size: {results['adjusted_shares']:.2f} shares")
-            st.write(f"Rounded Position Size: {results['adjusted_shares_div3']} shares")
-            st.write(f"Total Capital Required: {format_currency(results['capital_required'], st.session_state.selected_currency)}")
-            st.write(f"Technical Risk per Share: {format_currency(results['risk_per_share_tech'], st.session_state.selected_currency)}")
+            st.markdown(
+                "### Trade Analysis\n\n"
+                "#### Position Details\n\n"
+                f"Adjusted Position Size: {results['adjusted_shares']:.2f} shares\n\n"
+                f"Rounded Position Size: {results['adjusted_shares_div3']} shares\n\n"
+                f"Total Capital Required: {format_currency(results['capital_required'], currency)}\n\n"
+                f"Technical Risk per Share: {format_currency(results['risk_per_share_tech'], currency)}"
+            )
             
             # Risk-to-Reward Matrix
             st.markdown("#### Risk-to-Reward Matrix")
             matrix = generate_risk_reward_table(
                 entry_price_2, target_price_2, results['risk_per_share_tech']
             )
-            st.dataframe(matrix.style.format({
-                'Target Price': lambda x: format_currency(x, st.session_state.selected_currency),
-                'Reward per Share': lambda x: format_currency(x, st.session_state.selected_currency),
-                'Risk-to-Reward Ratio': '{:.2f}',
-                'Reward-to-Risk Ratio': '{:.2f}:1'
-            }))
+            if len(matrix):
+                st.table(format_risk_reward_table(matrix, currency))
+            else:
+                st.info("Target price must exceed entry price.")
             
             # Display Exit Strategy
-            display_exit_strategy(results['exit_strategy'], st.session_state.selected_currency)
+            display_exit_strategy(results['exit_strategy'], currency)
+
+# Main app
+st.title("Trade Risk Calculator")
+st.markdown("Calculate optimal position sizes and manage risk effectively")
+
+# Initialize session state for currency if not exists
+if 'selected_currency' not in st.session_state:
+    st.session_state.selected_currency = 'USD'
+
+# Currency selector with icons; a change reruns the whole app so that
+# the input labels in both calculators pick up the new symbol
+st.markdown("### Select Currency")
+st.radio(
+    "Select Currency",
+    options=list(CURRENCIES),
+    format_func=lambda code: f"{CURRENCIES[code]['icon']} {code}",
+    horizontal=True,
+    key='selected_currency',
+    label_visibility="collapsed"
+)
+
+# Info box
+with st.expander("ℹ️ Important Information", expanded=True):
+    st.info("""
+    - Use the Standard Calculator for basic risk assessment
+    - Fine-tune with the Position Size Calculator
+    - All calculations assume a 3-part exit strategy for optimal risk management
+    """)
+
+# Create two columns for the calculators
+col1, col2 = st.columns(2)
+
+# Standard Risk Calculator
+with col1:
+    _standard_calc_fragment()
+
+# Position Size Calculator
+with col2:
+    _position_calc_fragment()
 
 # Risk Management Tips
 st.markdown("### Risk Management Tips")
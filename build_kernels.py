@@ -0,0 +1,26 @@
+"""Compile the risk calculator kernels ahead of time.
+
+Run ``python build_kernels.py`` once at build time to produce the
+risk_kernels extension module next to app.py, so the app does not pay
+Numba's JIT compilation cost on startup. Rerun it after any change to
+kernels.py.
+
+numba.pycc is pending deprecation upstream. On numba 0.59 it raises a
+NumbaPendingDeprecationWarning, which is hidden under Python's default
+warning filters and only shows with e.g. ``python -W default``.
+"""
+from numba.pycc import CC
+
+from kernel_version import KERNEL_VERSION
+from kernels import CORE_CALC_SIG, core_calc
+
+cc = CC('risk_kernels')
+cc.export('core_calc', CORE_CALC_SIG)(core_calc.py_func)
+
+@cc.export('kernel_version', 'int64()')
+def kernel_version():
+    """Report the KERNEL_VERSION this module was built from."""
+    return KERNEL_VERSION
+
+if __name__ == "__main__":
+    cc.compile()
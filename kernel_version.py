@@ -0,0 +1,9 @@
+"""Version of the kernels in kernels.py.
+
+Bump KERNEL_VERSION whenever a kernel's inputs, outputs or arithmetic
+change. build_kernels.py bakes it into the risk_kernels extension module,
+and app.py ignores any build whose version does not match, so a stale
+build can never stand in for the current kernels. This lives in its own
+module so app.py can check it without importing Numba.
+"""
+KERNEL_VERSION = 1
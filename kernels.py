@@ -0,0 +1,48 @@
+"""Numerical kernels for the risk calculator.
+
+The kernels are compiled with Numba when it is installed and run as plain
+Python otherwise. build_kernels.py compiles core_calc ahead of time into the
+risk_kernels extension module, which app.py prefers when it is present.
+"""
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+# The explicit signature makes Numba compile core_calc eagerly at import
+# rather than on the first form submit; cache=True keeps the result on disk.
+CORE_CALC_SIG = 'UniTuple(float64, 5)(float64, float64, float64, float64, float64)'
+
+def _jit(*args, **kwargs):
+    """Apply njit with the given options, or leave the function as is without Numba."""
+    if njit is None:
+        return lambda func: func
+    return njit(*args, **kwargs)
+
+@_jit(CORE_CALC_SIG, cache=True)
+def core_calc(account_size, risk_percentage, number_of_shares, entry_price, target_price):
+    """Scalar kernel for the standard risk metrics.
+    
+    Returns (total_risk, risk_per_share, recommended_stop_loss, capital_required,
+    reward_per_share).
+    """
+    total_risk = account_size * (risk_percentage / 100.0)
+    risk_per_share = total_risk / number_of_shares
+    recommended_stop_loss = entry_price - risk_per_share
+    capital_required = number_of_shares * entry_price
+    reward_per_share = target_price - entry_price
+    
+    return (total_risk, risk_per_share, recommended_stop_loss, capital_required,
+            reward_per_share)
+
+# No signature here: the parallel kernel is only compiled when first called,
+# so importing this module never spins up Numba's threading layer.
+@_jit(parallel=True, cache=True)
+def core_calc_batch(account_sizes, risk_percentages, numbers_of_shares, entry_prices, target_prices, out):
+    """Evaluate core_calc over arrays of inputs, writing one row of 5 values per input into out."""
+    for i in prange(account_sizes.shape[0]):
+        row = core_calc(account_sizes[i], risk_percentages[i], numbers_of_shares[i],
+                        entry_prices[i], target_prices[i])
+        for j in range(5):
+            out[i, j] = row[j]